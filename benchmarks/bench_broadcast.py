@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# ============================================
+# Dashboard stream benchmark
+# ============================================
+"""
+Opens real Server-Sent Events connections to /api/dashboard/stream on a
+waitress server with a fixed thread pool, keeps them open, and meanwhile
+measures other endpoints over HTTP - every open stream holds a server thread,
+so without a cap enough dashboard tabs starve the API:
+
+    capped     BROADCAST_CONFIG as shipped - streams past the cap get 503 and the page polls
+    uncapped   no stream cap (the previous behaviour)
+
+    python benchmarks/bench_broadcast.py --threads 8 --streams 2 8 32 --duration 5
+
+Each run starts a fresh server in its own interpreter against the fixture
+yfinance (no network).
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+PROBES = {
+    "compliance": "/api/financial-data?type=compliance",
+    "dashboard": "/api/dashboard?symbol=AAPL",
+    "stock": "/api/financial-data?type=stock&symbol=AAPL"
+}
+
+
+def open_stream(port: int, timeout: float):
+    """Open one SSE connection; returns (status or None if no thread picked it up in time, socket)"""
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(b"GET /api/dashboard/stream?symbols=AAPL HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                 b"Accept: text/event-stream\r\n\r\n")
+    sock.settimeout(timeout)
+    try:
+        status_line = sock.recv(256).split(b"\r\n", 1)[0]
+        status = int(status_line.split()[1])
+    except (socket.timeout, IndexError, ValueError):
+        return None, sock
+    if status == 200:
+        # Keep reading so the server never blocks on a full socket buffer
+        sock.settimeout(None)
+        threading.Thread(target=lambda: [None for _ in iter(lambda: sock.recv(65536), b"")], daemon=True).start()
+    return status, sock
+
+
+def run_variant(variant: str, streams: int, args) -> dict:
+    from suite import configure, load_app, start_server
+    from loadtest import run_load
+    import tempfile
+
+    webapp = load_app(tempfile.mkdtemp(prefix="finops-broadcast-"))
+    configure(webapp, argparse.Namespace(upstream_ms=0.0, first_chunk_ms=0.0, chunks=1, chunk_interval_ms=0.0,
+                                         cold=False))
+    webapp.SERVER_CONFIG["threads"] = args.threads
+    if variant == "uncapped":
+        webapp.BROADCAST_CONFIG["max_stream_clients"] = 10 ** 6
+        webapp.SERVER_CONFIG["threads"] = 10 ** 6   # the route caps at a quarter of the threads too
+    base_url, stop = start_server(webapp.app, args.threads)
+    port = int(base_url.rsplit(":", 1)[1])
+    for path in PROBES.values():
+        run_load(base_url + path, duration=0.2, concurrency=1)   # warm-up
+
+    statuses = {}
+    sockets = []
+    for _ in range(streams):
+        status, sock = open_stream(port, args.connect_timeout)
+        key = str(status) if status is not None else "no_thread"
+        statuses[key] = statuses.get(key, 0) + 1
+        sockets.append(sock)
+
+    probes = {}
+    for name, path in PROBES.items():
+        result = run_load(base_url + path, "GET", None, args.concurrency, args.duration, args.timeout)
+        probes[name] = {"requests": result["requests"], "errors": result["errors"],
+                        "requests_per_second": result["requests_per_second"], "latency_ms": result["latency_ms"]}
+    return {
+        "variant": variant,
+        "server_threads": args.threads,
+        "streams_opened": streams,
+        "stream_responses": statuses,
+        "subscribers": webapp.DASHBOARD_BROADCASTER.subscriber_count(),
+        "probes": probes
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8, help="waitress worker threads")
+    parser.add_argument("--streams", type=int, nargs="+", default=[2, 8, 32], help="SSE connections held open")
+    parser.add_argument("--variants", nargs="+", choices=["capped", "uncapped"], default=["capped", "uncapped"])
+    parser.add_argument("--concurrency", type=int, default=2, help="probe clients per endpoint")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per probed endpoint")
+    parser.add_argument("--timeout", type=float, default=5.0, help="probe request timeout in seconds")
+    parser.add_argument("--connect-timeout", type=float, default=2.0, help="wait for a stream's status line")
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    parser.add_argument("--streams-count", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_variant(args.variant, args.streams_count, args)
+        json.dump(result, sys.stdout)
+        sys.stdout.flush()
+        os._exit(0)   # stream threads are still blocked on their queues
+
+    results = []
+    for variant in args.variants:
+        for streams in args.streams:
+            command = [sys.executable, __file__, "--variant", variant, "--streams-count", str(streams),
+                       "--threads", str(args.threads), "--concurrency", str(args.concurrency),
+                       "--duration", str(args.duration), "--timeout", str(args.timeout),
+                       "--connect-timeout", str(args.connect_timeout)]
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            results.append(json.loads(output))
+    json.dump({"benchmark": "dashboard_streams", "results": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# ============================================
+# Warm start benchmark
+# ============================================
+"""
+Measures the first request after startup for each request path that needs
+market data, against the fixture yfinance with added upstream latency:
+
+    cold        no prefetching - the request pays every upstream fetch
+    prefetched  PrefetchScheduler started, first tick finished before the request
+
+    python benchmarks/bench_prefetch.py --upstream-ms 200
+
+Each variant runs in a fresh interpreter so neither sees the other's cache.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(os.path.dirname(BENCH_DIR), "finance_webapp_v1.0.py")
+sys.path.insert(0, BENCH_DIR)
+
+REQUESTS = {
+    "stock": lambda service: service.get_stock_price("AAPL"),
+    "multiple": lambda service: service.get_multiple_stocks(["AAPL", "MSFT", "GOOGL", "AMZN"]),
+    "ratios": lambda service: service.get_financial_ratios("AAPL"),
+    "risk": lambda service: service.get_portfolio_risk()
+}
+
+
+def run_variant(variant: str, upstream_ms: float) -> dict:
+    from fakes.fake_yfinance import FixtureYFinance
+
+    os.environ["FINOPS_HISTORY_DIR"] = tempfile.mkdtemp(prefix="finops-prefetch-")
+    os.environ["FINOPS_OFFLINE"] = "0"
+    spec = importlib.util.spec_from_file_location("finance_webapp", APP_PATH)
+    webapp = importlib.util.module_from_spec(spec)
+    sys.modules["finance_webapp"] = webapp
+    spec.loader.exec_module(webapp)
+
+    fake_yf = FixtureYFinance(latency=upstream_ms / 1000)
+    webapp.yf = fake_yf
+    webapp.YFINANCE_AVAILABLE = True
+    for provider in webapp.MARKET_DATA.providers:
+        if isinstance(provider, webapp.HTTPProvider):
+            provider.api_key = ""
+
+    warm_seconds = None
+    if variant == "prefetched":
+        webapp.PREFETCH_CONFIG["spacing_seconds"] = 0.0
+        webapp.PREFETCHER.start()
+        while webapp.PREFETCHER.warm_seconds is None:
+            time.sleep(0.01)
+        warm_seconds = webapp.PREFETCHER.warm_seconds
+
+    results = {}
+    for name, call in REQUESTS.items():
+        calls_before = fake_yf.total_calls()
+        started = time.perf_counter()
+        call(webapp.FinancialDataService)
+        results[name] = {"ms": round((time.perf_counter() - started) * 1000, 1),
+                         "upstream_calls": fake_yf.total_calls() - calls_before}
+    webapp.PREFETCHER.stop()
+    return {"variant": variant, "warm_seconds": warm_seconds, "first_requests": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upstream-ms", type=float, default=200.0, help="latency added to every fake yfinance call")
+    parser.add_argument("--variant", choices=["cold", "prefetched"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.variant:
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_variant(args.variant, args.upstream_ms)
+        json.dump(result, sys.stdout)
+        return
+
+    results = []
+    for variant in ("cold", "prefetched"):
+        output = subprocess.run([sys.executable, __file__, "--variant", variant, "--upstream-ms", str(args.upstream_ms)],
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output))
+    json.dump({"benchmark": "prefetch", "upstream_ms": args.upstream_ms, "results": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
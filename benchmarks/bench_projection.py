@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# ============================================
+# Field projection benchmark
+# ============================================
+"""
+Compares upstream calls and bytes loaded for ratio lookups across a watchlist:
+the old get_financial_ratios (info + financials + balance_sheet for every
+symbol) against field-projected fetches.
+
+    python benchmarks/bench_projection.py --symbols AAPL MSFT GOOGL AMZN NVDA META
+
+Runs on a cold market cache against the fixture-backed yfinance stand-in.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(os.path.dirname(BENCH_DIR), "finance_webapp_v1.0.py")
+sys.path.insert(0, BENCH_DIR)
+
+from fakes.fake_yfinance import FixtureYFinance  # noqa: E402
+
+PROJECTIONS = {
+    "all_ratios": None,
+    "enrichment_ratios": ["pe_ratio", "debt_to_equity", "beta", "roe"],
+    "price_volume": ["price", "volume"]
+}
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("finance_webapp", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["finance_webapp"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_fetch(webapp, fake: FixtureYFinance, symbols: list) -> dict:
+    """What every get_financial_ratios call used to load"""
+    before = fake.total_calls()
+    loaded = 0
+    for symbol in symbols:
+        ticker = fake.Ticker(symbol)
+        for resource in (ticker.info, ticker.financials, ticker.balance_sheet):
+            loaded += webapp._approx_bytes(resource)
+    return {"upstream_calls": fake.total_calls() - before, "bytes_loaded": loaded}
+
+
+def projected_fetch(webapp, fake: FixtureYFinance, symbols: list, fields) -> dict:
+    webapp.MARKET_CACHE.clear()
+    before = fake.total_calls()
+    loaded = 0
+    for symbol in symbols:
+        result = webapp.FinancialDataService.get_financial_ratios(symbol, fields, include_report=True)
+        loaded += result["fetch_report"]["bytes_loaded"]
+    return {"upstream_calls": fake.total_calls() - before, "bytes_loaded": loaded}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", nargs="+", default=["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "JPM", "V"])
+    args = parser.parse_args(argv)
+
+    webapp = load_app()
+    fake = FixtureYFinance()
+    webapp.yf = fake
+    webapp.YFINANCE_AVAILABLE = True
+
+    results = {"legacy": legacy_fetch(webapp, fake, args.symbols)}
+    for name, fields in PROJECTIONS.items():
+        results[name] = projected_fetch(webapp, fake, args.symbols, fields)
+    json.dump({"benchmark": "field_projection", "symbols": len(args.symbols), "results": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# ============================================
+# Market data provider layer benchmark
+# ============================================
+"""
+Drives MarketDataRouter against the fixture yfinance and local Finnhub /
+Twelve Data stand-ins and reports where quotes came from and how long they
+took, for four situations:
+
+    healthy     yfinance answers quickly - no HTTP provider is touched
+    slow        yfinance is slower than the hedge threshold - Finnhub is raced against it
+    failing     yfinance raises - requests fail over to Finnhub, then Twelve Data
+    quota       burst larger than the Finnhub and Twelve Data quotas - the client-side
+                token buckets stop before the stand-ins have to reject anything
+
+    python benchmarks/bench_providers.py --requests 40 --hedge-ms 200 --slow-ms 1000
+"""
+
+import argparse
+import contextlib
+import copy
+import importlib.util
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(os.path.dirname(BENCH_DIR), "finance_webapp_v1.0.py")
+sys.path.insert(0, BENCH_DIR)
+
+from fakes.fake_yfinance import FixtureYFinance       # noqa: E402
+from fakes.market_http import start_market_server     # noqa: E402
+from loadtest import percentile                       # noqa: E402
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN"]
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("finance_webapp", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["finance_webapp"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class FailingYFinance(FixtureYFinance):
+    def Ticker(self, symbol):
+        raise ConnectionError("Yahoo Finance unavailable")
+
+
+def run_scenario(webapp, name: str, yfinance, args, limits: dict = None) -> dict:
+    # Fresh stand-ins per scenario, with the real free-tier quotas
+    server, stand_in, base_url = start_market_server(latency=args.http_latency_ms / 1000,
+                                                     quotas={"finnhub": (60, 60), "twelve_data": (8, 60)})
+    webapp.yf = yfinance
+    webapp.YFINANCE_AVAILABLE = True
+    config = copy.deepcopy(webapp.MARKET_PROVIDERS_CONFIG)
+    config["order"] = ["yfinance", "finnhub", "twelve_data"]
+    config["hedge_after_seconds"] = args.hedge_ms / 1000
+    config["providers"]["finnhub"]["base_url"] = f"{base_url}/finnhub"
+    config["providers"]["twelve_data"]["base_url"] = f"{base_url}/twelve_data"
+    for provider, limit in (limits or {}).items():
+        config["providers"][provider]["limits"] = [limit]
+    webapp.API_KEYS.update({"finnhub": "bench", "twelve_data": "bench"})
+    router = webapp.build_market_data_router(config)
+
+    latencies, sources, failures = [], {}, 0
+    for index in range(args.requests):
+        started = time.perf_counter()
+        try:
+            bar = router.quote(SYMBOLS[index % len(SYMBOLS)])
+            sources[bar["provider"]] = sources.get(bar["provider"], 0) + 1
+        except webapp.ProviderError:
+            failures += 1
+        latencies.append(time.perf_counter() - started)
+    server.shutdown()
+
+    return {
+        "scenario": name,
+        "requests": args.requests,
+        "served_by": sources,
+        "failures": failures,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p90": round(percentile(latencies, 90) * 1000, 1),
+            "max": round(max(latencies) * 1000, 1)
+        },
+        "stand_in_calls": stand_in.counts,
+        "router": router.stats()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--hedge-ms", type=float, default=200.0)
+    parser.add_argument("--slow-ms", type=float, default=1000.0, help="yfinance latency in the slow scenario")
+    parser.add_argument("--http-latency-ms", type=float, default=30.0, help="stand-in latency")
+    args = parser.parse_args(argv)
+
+    # The app logs to stdout - keep it on stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        webapp = load_app()
+        results = [
+            run_scenario(webapp, "healthy", FixtureYFinance(latency=0.01), args),
+            run_scenario(webapp, "slow", FixtureYFinance(latency=args.slow_ms / 1000), args),
+            run_scenario(webapp, "failing", FailingYFinance(), args),
+            # More requests than both free tiers allow in a minute
+            run_scenario(webapp, "quota", FailingYFinance(), args,
+                         limits={"finnhub": (20, 60), "twelve_data": (8, 60)})
+        ]
+    json.dump({"benchmark": "market_providers", "results": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# ============================================
+# Query router microbenchmark
+# ============================================
+"""
+Routes a fixed set of queries through the compiled QueryRouter and through the
+old per-agent any(word in query) scan, and reports queries/sec for each.
+
+    python benchmarks/bench_router.py --queries 100000
+    python benchmarks/bench_router.py --agents 10 --terms-per-agent 300
+
+With --agents/--terms-per-agent the keyword sets are synthetic, to show how
+both approaches behave as routing vocabularies grow.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import string
+import sys
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "finance_webapp_v1.0.py")
+
+SAMPLE_QUERIES = [
+    "Analyze recent suspicious transactions and identify fraud patterns",
+    "Check SOX compliance status and identify any regulatory violations",
+    "Calculate portfolio risk, VaR, and analyze current stock market volatility",
+    "Review financial ratios and assess fraud risk indicators",
+    "What happened to revenue last quarter?",
+    "Summarize PCI-DSS findings for the payments team"
+]
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("finance_webapp", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["finance_webapp"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_agents(agents: int, terms_per_agent: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    vocabulary = set()
+    while len(vocabulary) < agents * terms_per_agent:
+        words = rng.choice([1, 1, 1, 2])
+        vocabulary.add(" ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+                                for _ in range(words)))
+    vocabulary = sorted(vocabulary)
+    return {f"agent_{i}": {"keywords": vocabulary[i::agents]} for i in range(agents)}
+
+
+def synthetic_queries(definitions: dict, count: int, seed: int = 1) -> list:
+    """Sample queries with a couple of routing terms mixed into ordinary text"""
+    rng = random.Random(seed)
+    terms = [term for definition in definitions.values() for term in definition["keywords"]]
+    queries = []
+    for _ in range(count):
+        words = rng.choice(SAMPLE_QUERIES).split()
+        for _ in range(rng.randint(0, 2)):
+            words.insert(rng.randint(0, len(words)), rng.choice(terms))
+        queries.append(" ".join(words))
+    return queries
+
+
+def legacy_route(definitions: dict, query: str, default: list) -> list:
+    """The pre-router supervisor logic, generalized to any keyword table"""
+    query_lower = query.lower()
+    agents = [name for name, definition in definitions.items()
+              if any(word in query_lower for word in definition.get("keywords", ()))]
+    return agents or list(default)
+
+
+def time_calls(fn, queries: list) -> dict:
+    started = time.perf_counter()
+    for query in queries:
+        fn(query)
+    elapsed = time.perf_counter() - started
+    return {"seconds": round(elapsed, 4), "queries_per_second": round(len(queries) / elapsed)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--agents", type=int, default=0, help="synthetic agents (0 = use AGENTS)")
+    parser.add_argument("--terms-per-agent", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    if args.agents:
+        definitions = synthetic_agents(args.agents, args.terms_per_agent)
+        queries = synthetic_queries(definitions, args.queries)
+    else:
+        definitions = app.AGENTS
+        queries = [SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)] for i in range(args.queries)]
+
+    compile_started = time.perf_counter()
+    router = app.QueryRouter(definitions)
+    compile_ms = (time.perf_counter() - compile_started) * 1000
+    default = app.QUERY_ROUTING["default_agents"]
+
+    result = {
+        "benchmark": "query_router",
+        "queries": len(queries),
+        "agents": sum(1 for definition in definitions.values() if definition.get("keywords")),
+        "terms": len(router.terms),
+        "compile_ms": round(compile_ms, 2),
+        "router": time_calls(router.route, queries),
+        "legacy_scan": time_calls(lambda query: legacy_route(definitions, query, default), queries)
+    }
+    result["speedup"] = round(result["router"]["queries_per_second"] / result["legacy_scan"]["queries_per_second"], 2)
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# ============================================
+# Multi-worker shared cache benchmark
+# ============================================
+"""
+Starts N worker processes of the app, each serving the same request mix (as a
+round-robin load balancer eventually sends every popular request to every
+worker), and counts the upstream calls the whole fleet made - fixture yfinance
+calls, fake Bedrock invocations and fake pybritive checkouts/check-ins - for:
+
+    none     per-process caches (the default)
+    sqlite   FINOPS_SHARED_CACHE=sqlite - one cache file shared by every worker
+    redis    FINOPS_SHARED_CACHE=redis against FINOPS_REDIS_URL - any Redis-compatible server (needs redis-py)
+
+    python benchmarks/bench_shared_cache.py --workers 1 2 4 --upstream-ms 100
+
+With the shared cache the yfinance and Bedrock totals should stay flat as workers
+are added. Credentials are never shared, so every worker still checks out its own
+lease, but only the last one to exit checks it in.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(os.path.dirname(BENCH_DIR), "finance_webapp_v1.0.py")
+FAKES_DIR = os.path.join(BENCH_DIR, "fakes")
+sys.path.insert(0, BENCH_DIR)
+
+REQUESTS = [
+    ("GET", "/api/financial-data?type=stock&symbol=AAPL"),
+    ("GET", "/api/financial-data?type=stock&symbol=MSFT"),
+    ("GET", "/api/financial-data?type=ratios&symbol=AAPL"),
+    ("GET", "/api/financial-data?type=multiple&symbols=AAPL,MSFT,GOOGL,AMZN"),
+    ("GET", "/api/financial-data?type=history&symbol=AAPL&days=365"),
+    ("POST", "/api/analyze", {"query": "Calculate portfolio risk, VaR, and analyze current stock market volatility"}),
+    ("POST", "/api/analyze", {"query": "Analyze recent suspicious transactions and identify fraud patterns"})
+]
+
+
+def run_worker(args) -> dict:
+    """One worker process: import the app with stand-ins, wait for the shared start time, replay REQUESTS"""
+    from fakes.fake_agent_runtime import FakeAgentRuntime, FakeBotoSession
+    from fakes.fake_yfinance import FixtureYFinance
+
+    spec = importlib.util.spec_from_file_location("finance_webapp", APP_PATH)
+    webapp = importlib.util.module_from_spec(spec)
+    sys.modules["finance_webapp"] = webapp
+    spec.loader.exec_module(webapp)
+
+    fake_yf = FixtureYFinance(latency=args.upstream_ms / 1000)
+    webapp.yf = fake_yf
+    webapp.YFINANCE_AVAILABLE = True
+    webapp.boto3 = types.SimpleNamespace(Session=FakeBotoSession)
+    FakeBotoSession.runtime = FakeAgentRuntime(args.first_chunk_ms / 1000, chunks=5, chunk_interval=0.0)
+    for name, agent in webapp.AGENTS.items():
+        agent["agent_id"] = f"FAKE_{name.upper()}"
+        agent["alias_id"] = "FAKE_ALIAS"
+    for provider in webapp.MARKET_DATA.providers:
+        if isinstance(provider, webapp.HTTPProvider):
+            provider.api_key = ""
+
+    time.sleep(max(args.start_at - time.time(), 0))
+    errors = []
+
+    def replay(offset: int):
+        client = webapp.app.test_client()
+        for index in range(len(REQUESTS)):
+            method, path, *body = REQUESTS[(index + offset) % len(REQUESTS)]
+            response = client.open(path, method=method, json=body[0] if body else None)
+            if response.status_code != 200:
+                errors.append(f"{method} {path}: {response.status_code}")
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=replay, args=(offset,)) for offset in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    webapp.PREFETCHER.stop()
+    return {"pid": os.getpid(), "seconds": round(elapsed, 3), "errors": errors,
+            "yfinance_calls": fake_yf.total_calls(), "bedrock_invocations": FakeBotoSession.runtime.stats()["invocations"],
+            "shared_cache": webapp.shared_cache_stats()}
+
+
+def run_fleet(backend: str, workers: int, args) -> dict:
+    scratch = tempfile.mkdtemp(prefix="finops-shared-")
+    britive_log = os.path.join(scratch, "pybritive.log")
+    env = dict(os.environ, FINOPS_SHARED_CACHE=backend, FINOPS_SHARED_CACHE_PATH=os.path.join(scratch, "cache.sqlite3"),
+               FINOPS_HISTORY_DIR=os.path.join(scratch, "history"), FINOPS_OFFLINE="0", FINOPS_PREFETCH="0",
+               FAKE_PYBRITIVE_LOG=britive_log, PATH=FAKES_DIR + os.pathsep + os.environ.get("PATH", ""))
+    env.pop("FINOPS_AGENT_CACHE_FILE", None)
+    start_at = time.time() + 3.0   # every worker imported and waiting before the first request
+    command = [sys.executable, __file__, "--worker", "--start-at", str(start_at), "--threads", str(args.threads),
+               "--upstream-ms", str(args.upstream_ms), "--first-chunk-ms", str(args.first_chunk_ms)]
+    processes = [subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+                 for _ in range(workers)]
+    results = [json.loads(process.communicate()[0]) for process in processes]
+    britive_calls = []
+    if os.path.exists(britive_log):
+        with open(britive_log) as f:
+            britive_calls = [line.split()[1] for line in f]
+    return {
+        "backend": backend,
+        "workers": workers,
+        "requests": workers * args.threads * len(REQUESTS),
+        "errors": sum(len(result["errors"]) for result in results),
+        "slowest_worker_seconds": max(result["seconds"] for result in results),
+        "upstream": {
+            "yfinance_calls": sum(result["yfinance_calls"] for result in results),
+            "bedrock_invocations": sum(result["bedrock_invocations"] for result in results),
+            "pybritive_checkouts": britive_calls.count("checkout"),
+            "pybritive_checkins": britive_calls.count("checkin")
+        },
+        "shared_cache": results[0]["shared_cache"]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--backends", nargs="+", choices=["none", "sqlite", "redis"], default=["none", "sqlite"])
+    parser.add_argument("--threads", type=int, default=4, help="concurrent clients per worker")
+    parser.add_argument("--upstream-ms", type=float, default=100.0, help="latency added to every fake yfinance call")
+    parser.add_argument("--first-chunk-ms", type=float, default=200.0, help="fake Bedrock time to first chunk")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--start-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_worker(args)
+        json.dump(result, sys.stdout)
+        sys.stdout.flush()
+        sys.stdout = sys.stderr   # credential check-in at exit prints too
+        return
+
+    results = [run_fleet(backend, workers, args) for backend in args.backends for workers in args.workers]
+    json.dump({"benchmark": "shared_cache", "results": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# ============================================
+# Cold start benchmark
+# ============================================
+"""
+Starts the app in a fresh interpreter (waitress, prefetching off) and measures
+the time from process launch until GET / has been served, plus the import-time
+profile of the heaviest modules:
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 5 --baseline HEAD~1   # compare with an earlier revision
+
+--baseline runs the same measurement on `git show REV:finance_webapp_v1.0.py`.
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from statistics import median
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+APP_PATH = os.path.join(REPO_DIR, "finance_webapp_v1.0.py")
+HEAVY_MODULES = ["yfinance", "pandas", "numpy", "boto3", "botocore", "requests", "flask", "flask_cors", "waitress"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def app_env(port: int) -> dict:
+    env = dict(os.environ, FINOPS_PORT=str(port), FINOPS_HOST="127.0.0.1", FINOPS_SERVER="waitress",
+               FINOPS_PREFETCH="0", FINOPS_HISTORY_DIR=tempfile.mkdtemp(prefix="finops-startup-"))
+    env.pop("FINOPS_TRANSACTION_FEED", None)
+    return env
+
+
+def time_to_first_request(app_path: str, timeout: float) -> dict:
+    """Seconds from spawning the app until GET / returned 200"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, app_path], env=app_env(port), cwd=REPO_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    response.read()
+                    first_request = time.perf_counter() - started
+                    break
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{app_path} exited with status {process.returncode}")
+                time.sleep(0.005)
+        else:
+            raise RuntimeError(f"{app_path} did not serve / within {timeout}s")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/startup", timeout=1) as response:
+                profile = json.load(response)
+        except OSError:
+            profile = None   # revisions before /api/startup existed
+        return {"first_request_seconds": first_request, "profile": profile}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def import_profile(app_path: str, top: int) -> dict:
+    """Cumulative -X importtime per top-level module while importing the app"""
+    code = ("import importlib.util, sys; "
+            f"spec = importlib.util.spec_from_file_location('finance_webapp', {app_path!r}); "
+            "module = importlib.util.module_from_spec(spec); sys.modules['finance_webapp'] = module; "
+            "spec.loader.exec_module(module)")
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=app_env(free_port()),
+                            cwd=REPO_DIR, capture_output=True, text=True).stderr
+    cumulative = {}
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match and not match.group(2):   # top level of the import tree
+            name = match.group(3).split(".")[0]
+            cumulative[name] = cumulative.get(name, 0) + int(match.group(1))
+    heaviest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_ms": round(sum(cumulative.values()) / 1000, 1),
+        "heaviest_ms": {name: round(us / 1000, 1) for name, us in heaviest},
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in cumulative]
+    }
+
+
+def measure(label: str, app_path: str, args) -> dict:
+    runs = [time_to_first_request(app_path, args.timeout) for _ in range(args.runs)]
+    seconds = [run["first_request_seconds"] for run in runs]
+    return {
+        "label": label,
+        "runs": args.runs,
+        "first_request_ms": {"median": round(median(seconds) * 1000, 1), "min": round(min(seconds) * 1000, 1),
+                             "max": round(max(seconds) * 1000, 1)},
+        "app_profile": runs[-1]["profile"],
+        "import_profile": import_profile(app_path, args.top)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the first response")
+    parser.add_argument("--top", type=int, default=10, help="modules listed in the import profile")
+    parser.add_argument("--baseline", metavar="REV", help="also measure finance_webapp_v1.0.py at this git revision")
+    args = parser.parse_args(argv)
+
+    results = []
+    if args.baseline:
+        source = subprocess.run(["git", "show", f"{args.baseline}:finance_webapp_v1.0.py"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        with tempfile.NamedTemporaryFile("w", suffix=".py", dir=REPO_DIR, prefix=".startup-baseline-",
+                                         delete=False) as f:
+            f.write(source)
+        try:
+            results.append(measure(args.baseline, f.name, args))
+        finally:
+            os.unlink(f.name)
+    results.append(measure("current", APP_PATH, args))
+    json.dump({"benchmark": "startup", "results": results}, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# ============================================
+# Fake bedrock-agent-runtime for offline runs
+# ============================================
+"""
+Stand-in for boto3's bedrock-agent-runtime client. invoke_agent() returns a
+completion stream whose first chunk arrives after `first_chunk_latency`
+seconds, followed by `chunks - 1` more chunks `chunk_interval` seconds apart.
+
+FakeBotoSession replaces boto3.Session so the app's normal credential
+checkout (with the fake pybritive on PATH) ends up holding this client.
+"""
+
+import threading
+import time
+
+
+class FakeAgentRuntime:
+    """invoke_agent with configurable latency; counts calls and bytes streamed"""
+
+    def __init__(self, first_chunk_latency: float = 0.5, chunks: int = 20, chunk_interval: float = 0.02,
+                 chunk_text: str = "Synthetic analysis text for benchmarking. "):
+        self.first_chunk_latency = first_chunk_latency
+        self.chunks = chunks
+        self.chunk_interval = chunk_interval
+        self.chunk_text = chunk_text
+        self.invocations = 0
+        self.prompt_bytes = 0
+        self._lock = threading.Lock()
+
+    def invoke_agent(self, agentId: str, agentAliasId: str, sessionId: str, inputText: str, **kwargs) -> dict:
+        with self._lock:
+            self.invocations += 1
+            self.prompt_bytes += len(inputText.encode("utf-8"))
+        return {"completion": self._completion(agentId), "sessionId": sessionId}
+
+    def _completion(self, agent_id: str):
+        time.sleep(self.first_chunk_latency)
+        for index in range(self.chunks):
+            if index:
+                time.sleep(self.chunk_interval)
+            yield {"chunk": {"bytes": f"[{agent_id} {index}] {self.chunk_text}".encode("utf-8")}}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"invocations": self.invocations, "prompt_bytes": self.prompt_bytes}
+
+
+class FakeBotoSession:
+    """boto3.Session replacement whose clients are all the shared FakeAgentRuntime"""
+
+    runtime = FakeAgentRuntime()
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def client(self, service_name: str, **kwargs):
+        return self.runtime
@@ -0,0 +1,147 @@
+# ============================================
+# Fixture-backed yfinance stand-in
+# ============================================
+"""
+Offline replacement for the parts of yfinance the web app uses: Ticker(...).info,
+.history(), .financials, .balance_sheet and download(). Prices are a seeded
+random walk per symbol, so every run sees the same bars; metadata comes from
+benchmarks/fixtures/yfinance.json.
+
+    app.yf = FixtureYFinance(latency=0.05)   # 50 ms per upstream call
+    app.yf = OutageYFinance(hang=2.0)        # every call hangs 2 s, then fails
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "yfinance.json")
+
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827,
+               "10y": 3653, "max": 3653}
+
+
+class FixtureYFinance:
+    """Deterministic bars and fixture metadata, with optional per-call latency and call counters"""
+
+    def __init__(self, fixture_path: str = FIXTURE_PATH, latency: float = 0.0):
+        with open(fixture_path) as f:
+            self.fixture = json.load(f)
+        self.latency = latency
+        self.calls = {}
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def _call(self, name: str):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def _spec(self, symbol: str) -> dict:
+        spec = dict(self.fixture["default"])
+        spec.update(self.fixture["symbols"].get(symbol.upper(), {}))
+        return spec
+
+    def _frame(self, symbol: str) -> pd.DataFrame:
+        """Full daily history ending today, built once per symbol"""
+        with self._lock:
+            frame = self._frames.get(symbol)
+        if frame is not None:
+            return frame
+
+        spec = self._spec(symbol)
+        end = pd.Timestamp(date.today())
+        index = pd.bdate_range(end=end, periods=int(self.fixture["history_years"] * 252))
+        rng = np.random.default_rng(zlib.crc32(symbol.upper().encode()))
+        daily_vol = spec["volatility"] / np.sqrt(252)
+        returns = rng.normal(spec["drift"] / 252 - daily_vol ** 2 / 2, daily_vol, len(index))
+        # Walk backwards from the fixture price so today's close matches it
+        close = spec["price"] * np.exp(np.cumsum(returns) - returns.sum())
+        open_ = close * np.exp(rng.normal(0, daily_vol / 3, len(index)))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, daily_vol / 2, len(index))))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, daily_vol / 2, len(index))))
+        volume = rng.poisson(spec["volume"], len(index))
+        frame = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+                             index=index.rename("Date"))
+        with self._lock:
+            self._frames[symbol] = frame
+        return frame
+
+    def _slice(self, symbol: str, period: str = None, start=None) -> pd.DataFrame:
+        frame = self._frame(symbol)
+        if start is not None:
+            return frame[frame.index >= pd.Timestamp(start)]
+        days = PERIOD_DAYS.get(period or "1mo", 31)
+        if days == 1:
+            return frame.iloc[-1:]
+        return frame[frame.index > frame.index[-1] - timedelta(days=days)]
+
+    def download(self, symbols, period: str = None, start=None, **kwargs) -> pd.DataFrame:
+        self._call("download")
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        frames = {symbol: self._slice(symbol, period, start) for symbol in symbols}
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+    def Ticker(self, symbol: str) -> "FixtureTicker":
+        return FixtureTicker(self, symbol)
+
+
+class FixtureTicker:
+    def __init__(self, source: FixtureYFinance, symbol: str):
+        self.source = source
+        self.symbol = symbol
+
+    @property
+    def info(self) -> dict:
+        self.source._call("info")
+        spec = self.source._spec(self.symbol)
+        info = dict(spec["info"], symbol=self.symbol.upper())
+        info.setdefault("currentPrice", float(self.source._frame(self.symbol)["Close"].iloc[-1]))
+        return info
+
+    def history(self, period: str = None, start=None, **kwargs) -> pd.DataFrame:
+        self.source._call("history")
+        return self.source._slice(self.symbol, period, start)
+
+    def _statement(self, name: str, rows: dict) -> pd.DataFrame:
+        self.source._call(name)
+        scale = self.source._spec(self.symbol)["info"].get("marketCap", 1e10) / 30
+        years = pd.to_datetime([f"{date.today().year - offset}-12-31" for offset in range(1, 5)])
+        return pd.DataFrame({year: {row: share * scale * (1 - 0.05 * i) for row, share in rows.items()}
+                             for i, year in enumerate(years)})
+
+    @property
+    def financials(self) -> pd.DataFrame:
+        return self._statement("financials", {"Total Revenue": 1.0, "Gross Profit": 0.45,
+                                              "Operating Income": 0.3, "Net Income": 0.25})
+
+    @property
+    def balance_sheet(self) -> pd.DataFrame:
+        return self._statement("balance_sheet", {"Total Assets": 1.4, "Total Liabilities Net Minority Interest": 1.1,
+                                                 "Stockholders Equity": 0.3, "Total Debt": 0.4})
+
+
+class OutageYFinance(FixtureYFinance):
+    """Upstream outage: every call hangs for `hang` seconds and then raises"""
+
+    def __init__(self, fixture_path: str = FIXTURE_PATH, hang: float = 2.0):
+        super().__init__(fixture_path, latency=hang)
+
+    def download(self, symbols, period: str = None, start=None, **kwargs):
+        self._call("download")
+        raise ConnectionError("Yahoo Finance unavailable")
+
+    def Ticker(self, symbol: str):
+        self._call("ticker")
+        raise ConnectionError("Yahoo Finance unavailable")
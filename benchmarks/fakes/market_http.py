@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# ============================================
+# Local Finnhub / Twelve Data stand-ins
+# ============================================
+"""
+Serves the /quote endpoints of Finnhub and Twelve Data from the yfinance
+fixture, with per-provider latency and quotas, so the provider layer can be
+exercised without network access or real API keys:
+
+    python benchmarks/fakes/market_http.py --port 8765 --latency-ms 80 --finnhub-quota 60/60
+    FINNHUB_BASE_URL=http://127.0.0.1:8765/finnhub \\
+    TWELVE_DATA_BASE_URL=http://127.0.0.1:8765/twelve_data python finance_webapp_v1.0.py
+
+Over quota, Finnhub answers HTTP 429 and Twelve Data answers 200 with
+{"status": "error", "code": 429}, as the real services do.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "yfinance.json")
+
+
+class Quota:
+    """Sliding-window call limit, e.g. 60 calls per 60 seconds"""
+
+    def __init__(self, calls: int, per_seconds: float):
+        self.calls = calls
+        self.per_seconds = per_seconds
+        self.history = deque()
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            while self.history and now - self.history[0] >= self.per_seconds:
+                self.history.popleft()
+            if len(self.history) >= self.calls:
+                return False
+            self.history.append(now)
+            return True
+
+
+class MarketStandIn:
+    def __init__(self, latency: float = 0.0, quotas: dict = None, fixture_path: str = FIXTURE_PATH):
+        with open(fixture_path) as f:
+            self.fixture = json.load(f)
+        self.latency = {"finnhub": latency, "twelve_data": latency}
+        self.quotas = {name: Quota(*limit) for name, limit in (quotas or {}).items()}
+        self.counts = {"finnhub": 0, "twelve_data": 0, "rejected": 0}
+        self.lock = threading.Lock()
+
+    def price(self, symbol: str):
+        spec = self.fixture["symbols"].get(symbol.upper())
+        return None if spec is None else float(spec["price"])
+
+    def handle(self, provider: str, params: dict):
+        """Returns (status, body)"""
+        with self.lock:
+            self.counts[provider] += 1
+        if self.latency.get(provider):
+            time.sleep(self.latency[provider])
+        quota = self.quotas.get(provider)
+        if quota is not None and not quota.allow():
+            with self.lock:
+                self.counts["rejected"] += 1
+            if provider == "finnhub":
+                return 429, {"error": "API limit reached. Please try again later."}
+            return 200, {"code": 429, "message": "You have run out of API credits", "status": "error"}
+
+        symbol = params.get("symbol", [""])[0]
+        price = self.price(symbol)
+        if provider == "finnhub":
+            if price is None:
+                return 200, {"c": 0, "d": None, "dp": None, "h": 0, "l": 0, "o": 0, "pc": 0, "t": 0}
+            return 200, {"c": price, "d": 0.5, "dp": 0.22, "h": price * 1.01, "l": price * 0.99,
+                         "o": price - 0.5, "pc": price - 0.5, "t": int(time.time())}
+        if price is None:
+            return 200, {"code": 404, "message": f"symbol {symbol} not found", "status": "error"}
+        return 200, {"symbol": symbol.upper(), "datetime": date.today().isoformat(), "open": f"{price - 0.5:.5f}",
+                     "close": f"{price:.5f}", "volume": "1000000", "change": "0.5", "percent_change": "0.22",
+                     "timestamp": int(datetime.now().timestamp())}
+
+
+def make_handler(stand_in: MarketStandIn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, like the real APIs
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if len(parts) != 2 or parts[0] not in ("finnhub", "twelve_data") or parts[1] != "quote":
+                status, body = 404, {"error": "not found"}
+            else:
+                status, body = stand_in.handle(parts[0], parse_qs(url.query))
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_market_server(port: int = 0, latency: float = 0.0, quotas: dict = None):
+    """Start in a daemon thread; returns (server, stand_in, base_url)"""
+    stand_in = MarketStandIn(latency, quotas)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(stand_in))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stand_in, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def parse_quota(value: str):
+    calls, per_seconds = value.split("/")
+    return int(calls), float(per_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--finnhub-quota", type=parse_quota, default=(60, 60), help="calls/seconds")
+    parser.add_argument("--twelve-quota", type=parse_quota, default=(8, 60), help="calls/seconds")
+    args = parser.parse_args()
+
+    server, _, base_url = start_market_server(args.port, args.latency_ms / 1000,
+                                              {"finnhub": args.finnhub_quota, "twelve_data": args.twelve_quota})
+    print(f"Finnhub stand-in:     {base_url}/finnhub")
+    print(f"Twelve Data stand-in: {base_url}/twelve_data")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# ============================================
+# Fixed-concurrency HTTP load test
+# ============================================
+"""
+Closed-loop load generator: N workers each send requests back to back for a
+fixed duration, then requests/sec and latency percentiles are printed as JSON.
+
+    python benchmarks/loadtest.py --url "http://localhost:5001/api/financial-data?type=compliance" \\
+        --concurrency 32 --duration 15
+
+    python benchmarks/loadtest.py --url http://localhost:5001/api/analyze --method POST \\
+        --body '{"query": "Check SOX compliance"}' --concurrency 8 --label after
+
+Run once against the old server and once against the new one with the same
+arguments to compare.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run_load(url: str, method: str = "GET", body: bytes = None, concurrency: int = 8,
+             duration: float = 10.0, timeout: float = 60.0) -> Dict:
+    """Drive url with `concurrency` closed-loop workers for `duration` seconds"""
+    latencies = []
+    errors = {"count": 0, "statuses": {}}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    headers = {"Content-Type": "application/json"} if body else {}
+
+    def worker():
+        local_latencies = []
+        local_errors = []
+        while time.perf_counter() < deadline:
+            request = urllib.request.Request(url, data=body, method=method, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                local_latencies.append(time.perf_counter() - started)
+            except urllib.error.HTTPError as e:
+                local_errors.append(str(e.code))
+            except Exception as e:
+                local_errors.append(type(e).__name__)
+        with lock:
+            latencies.extend(local_latencies)
+            for error in local_errors:
+                errors["count"] += 1
+                errors["statuses"][error] = errors["statuses"].get(error, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "url": url,
+        "method": method,
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 3),
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p90": round(percentile(latencies, 90) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2) if latencies else 0.0
+        }
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--body", help="JSON request body (sent with Content-Type: application/json)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--label", help="tag stored in the result, e.g. 'before' or 'after'")
+    args = parser.parse_args(argv)
+
+    result = run_load(args.url, args.method.upper(), args.body.encode() if args.body else None,
+                      args.concurrency, args.duration, args.timeout)
+    if args.label:
+        result["label"] = args.label
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
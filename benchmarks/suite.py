@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# ============================================
+# Offline benchmark suite
+# ============================================
+"""
+Runs the web app against local stand-ins - fixture-backed yfinance, the fake
+pybritive CLI and a fake bedrock-agent-runtime that streams chunks with
+configurable latency - and measures:
+
+    financial_data   GET /api/financial-data for every type, per concurrency level
+    analyze          POST /api/analyze with the agent response cache bypassed, and with it on
+    routing          QueryRouter.route throughput (in-process)
+    enrichment       prompt enrichment latency per agent type (in-process, concurrent)
+    outage           GET /api/financial-data after yfinance starts hanging and failing - cached
+                     symbols are served stale, uncached ones fail fast once the circuit opens
+
+    python benchmarks/suite.py --concurrency 1 8 32 --duration 5 --output before.json
+    python benchmarks/suite.py --scenarios analyze --first-chunk-ms 800 --upstream-ms 50
+
+Results are a single JSON document tagged with the git commit, so runs from
+different commits can be diffed directly. No network access is needed.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.parse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+APP_PATH = os.path.join(REPO_DIR, "finance_webapp_v1.0.py")
+FAKES_DIR = os.path.join(BENCH_DIR, "fakes")
+sys.path.insert(0, BENCH_DIR)
+
+from bench_router import SAMPLE_QUERIES                  # noqa: E402
+from fakes.fake_agent_runtime import FakeAgentRuntime, FakeBotoSession  # noqa: E402
+from fakes.fake_yfinance import FixtureYFinance, OutageYFinance  # noqa: E402
+from loadtest import percentile, run_load                # noqa: E402
+
+SCENARIOS = ("financial_data", "analyze", "routing", "enrichment", "outage")
+
+FINANCIAL_DATA_REQUESTS = {
+    "stock": {"symbol": "AAPL"},
+    "ratios": {"symbol": "AAPL"},
+    "multiple": {"symbols": "AAPL,MSFT,GOOGL,AMZN"},
+    "transactions": {"count": 20},
+    "compliance": {},
+    "history": {"symbol": "AAPL", "days": 365},
+    "risk": {"symbols": "AAPL,MSFT,GOOGL,AMZN"},
+    "cache": {}
+}
+
+ANALYZE_QUERIES = [
+    "Analyze recent suspicious transactions and identify fraud patterns",
+    "Check SOX compliance status and identify any regulatory violations",
+    "Calculate portfolio risk, VaR, and analyze current stock market volatility"
+]
+
+
+def load_app(history_dir: str):
+    """Import the app with offline-friendly environment and stand-ins installed"""
+    os.environ["FINOPS_HISTORY_DIR"] = history_dir
+    os.environ["FINOPS_OFFLINE"] = "0"                   # history syncs go to the fake yfinance
+    os.environ.pop("FINOPS_AGENT_CACHE_FILE", None)
+    os.environ["PATH"] = FAKES_DIR + os.pathsep + os.environ.get("PATH", "")
+
+    spec = importlib.util.spec_from_file_location("finance_webapp", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["finance_webapp"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def configure(webapp, args) -> dict:
+    fake_yf = FixtureYFinance(latency=args.upstream_ms / 1000)
+    webapp.yf = fake_yf
+    webapp.YFINANCE_AVAILABLE = True
+    webapp.boto3 = types.SimpleNamespace(Session=FakeBotoSession)
+    FakeBotoSession.runtime = FakeAgentRuntime(args.first_chunk_ms / 1000, args.chunks, args.chunk_interval_ms / 1000)
+    for name, agent in webapp.AGENTS.items():
+        agent["agent_id"] = f"FAKE_{name.upper()}"
+        agent["alias_id"] = "FAKE_ALIAS"
+    # Offline: quotes come from the yfinance stand-in only, never the real Finnhub / Twelve Data
+    for provider in webapp.MARKET_DATA.providers:
+        if isinstance(provider, webapp.HTTPProvider):
+            provider.api_key = ""
+    if args.cold:
+        for field in webapp.CACHE_CONFIG["ttl"]:
+            webapp.CACHE_CONFIG["ttl"][field] = 0
+        webapp.CACHE_CONFIG["stale_ttl"].clear()
+    return {"yfinance": fake_yf, "runtime": FakeBotoSession.runtime}
+
+
+def start_server(app, threads: int):
+    """Serve on an ephemeral localhost port; returns (base_url, stop)"""
+    try:
+        from waitress.server import create_server
+    except ImportError:
+        from werkzeug.serving import make_server
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+    server = create_server(app, host="127.0.0.1", port=0, threads=threads)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.effective_port}", server.close
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_financial_data(base_url: str, args) -> list:
+    results = []
+    for data_type, params in FINANCIAL_DATA_REQUESTS.items():
+        url = f"{base_url}/api/financial-data?" + urllib.parse.urlencode(dict(params, type=data_type))
+        run_load(url, duration=0.2, concurrency=1)        # warm-up: history sync, metadata
+        for concurrency in args.concurrency:
+            result = run_load(url, "GET", None, concurrency, args.duration, args.timeout)
+            result["type"] = data_type
+            results.append(result)
+    return results
+
+
+def bench_analyze(base_url: str, args, fakes: dict) -> list:
+    results = []
+    for label, use_cache in (("uncached", False), ("cached", True)):
+        for concurrency in args.concurrency:
+            for query in ANALYZE_QUERIES:
+                body = json.dumps({"query": query, "cache": use_cache}).encode()
+                invocations_before = fakes["runtime"].stats()["invocations"]
+                result = run_load(f"{base_url}/api/analyze", "POST", body, concurrency, args.duration, args.timeout)
+                result["variant"] = label
+                result["query"] = query
+                result["agent_invocations"] = fakes["runtime"].stats()["invocations"] - invocations_before
+                results.append(result)
+    return results
+
+
+def bench_routing(webapp, args) -> dict:
+    router = webapp.QUERY_ROUTER
+    queries = [SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)] for i in range(args.routing_queries)]
+    started = time.perf_counter()
+    for query in queries:
+        router.route(query)
+    elapsed = time.perf_counter() - started
+    return {"queries": len(queries), "seconds": round(elapsed, 4),
+            "queries_per_second": round(len(queries) / elapsed)}
+
+
+def bench_enrichment(webapp, args) -> list:
+    results = []
+    for agent_type in webapp.AGENT_ENRICHMENT:
+        webapp.BritiveAgentCoreClient().enrich_with_metadata("warm-up", agent_type)
+        for concurrency in args.concurrency:
+            latencies = []
+            degraded = [0]
+            lock = threading.Lock()
+            deadline = time.perf_counter() + args.duration
+
+            def worker():
+                local = []
+                local_degraded = 0
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    # A client per call, as per request in the app (each carries its own trace)
+                    _, metadata = webapp.BritiveAgentCoreClient().enrich_with_metadata("Benchmark query", agent_type)
+                    local.append(time.perf_counter() - started)
+                    local_degraded += metadata["degraded"]
+                with lock:
+                    latencies.extend(local)
+                    degraded[0] += local_degraded
+
+            threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            results.append({
+                "agent": agent_type,
+                "concurrency": concurrency,
+                "enrichments": len(latencies),
+                "degraded": degraded[0],
+                "per_second": round(len(latencies) / elapsed, 2),
+                "latency_ms": {
+                    "p50": round(percentile(latencies, 50) * 1000, 2),
+                    "p90": round(percentile(latencies, 90) * 1000, 2),
+                    "p99": round(percentile(latencies, 99) * 1000, 2)
+                }
+            })
+    return results
+
+
+OUTAGE_REQUESTS = {
+    "stock_cached": {"type": "stock", "symbol": "AAPL"},
+    "multiple_cached": {"type": "multiple", "symbols": "AAPL,MSFT,GOOGL,AMZN"},
+    "stock_uncached": {"type": "stock", "symbol": "NVDA"}
+}
+
+
+def bench_outage(webapp, base_url: str, args, fakes: dict) -> dict:
+    # Warm the cache while the upstream is healthy, with TTL 0 so every later read is past it, then take it down
+    ttl = dict(webapp.CACHE_CONFIG["ttl"])
+    webapp.CACHE_CONFIG["ttl"].update(quote=0, info=0)
+    webapp.MARKET_CACHE.clear()
+    for params in OUTAGE_REQUESTS.values():
+        if params["symbol" if "symbol" in params else "symbols"] != "NVDA":
+            run_load(f"{base_url}/api/financial-data?" + urllib.parse.urlencode(params), duration=0.2, concurrency=1)
+    webapp.yf = OutageYFinance(hang=args.outage_hang_ms / 1000)
+    try:
+        results = []
+        for name, params in OUTAGE_REQUESTS.items():
+            url = f"{base_url}/api/financial-data?" + urllib.parse.urlencode(params)
+            for concurrency in args.concurrency:
+                result = run_load(url, "GET", None, concurrency, args.duration, args.timeout)
+                result["request"] = name
+                results.append(result)
+        return {
+            "hang_ms": args.outage_hang_ms,
+            "results": results,
+            "upstream_calls_during_outage": dict(webapp.yf.calls),
+            "cache": webapp.MARKET_CACHE.stats(),
+            "circuits": {provider.name: provider.breaker.stats() for provider in webapp.MARKET_DATA.providers}
+        }
+    finally:
+        webapp.yf = fakes["yfinance"]
+        webapp.CACHE_CONFIG["ttl"].update(ttl)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per measurement")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--threads", type=int, default=32, help="server worker threads")
+    parser.add_argument("--upstream-ms", type=float, default=0.0, help="latency added to every fake yfinance call")
+    parser.add_argument("--first-chunk-ms", type=float, default=500.0, help="fake agent time to first chunk")
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per fake agent response")
+    parser.add_argument("--chunk-interval-ms", type=float, default=20.0)
+    parser.add_argument("--routing-queries", type=int, default=100_000)
+    parser.add_argument("--outage-hang-ms", type=float, default=2000.0, help="how long each yfinance call hangs in the outage scenario")
+    parser.add_argument("--cold", action="store_true", help="disable market data caching (TTL 0)")
+    parser.add_argument("--label", help="tag stored in the result, e.g. 'before' or 'after'")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    # The app logs to stdout - keep it on stderr so stdout stays valid JSON
+    with tempfile.TemporaryDirectory(prefix="finops-bench-") as history_dir, contextlib.redirect_stdout(sys.stderr):
+        webapp = load_app(history_dir)
+        fakes = configure(webapp, args)
+        base_url, stop = start_server(webapp.app, args.threads)
+        try:
+            results = {}
+            if "financial_data" in args.scenarios:
+                results["financial_data"] = bench_financial_data(base_url, args)
+            if "analyze" in args.scenarios:
+                results["analyze"] = bench_analyze(base_url, args, fakes)
+            if "routing" in args.scenarios:
+                results["routing"] = bench_routing(webapp, args)
+            if "enrichment" in args.scenarios:
+                results["enrichment"] = bench_enrichment(webapp, args)
+            if "outage" in args.scenarios:
+                results["outage"] = bench_outage(webapp, base_url, args, fakes)
+        finally:
+            stop()
+            webapp.CREDENTIALS.shutdown()
+            webapp.MARKET_CACHE.refresh_executor.shutdown(wait=True)   # outage refreshes still hanging
+
+        report = {
+            "benchmark": "suite",
+            "label": args.label,
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "label")},
+            "upstream_calls": dict(fakes["yfinance"].calls),
+            "agent_runtime": fakes["runtime"].stats(),
+            "credentials": webapp.CREDENTIALS.stats(),
+            "results": results
+        }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, "finance_webapp_v1.0.py")
+FAKES_DIR = os.path.join(REPO_DIR, "benchmarks", "fakes")
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def webapp(tmp_path_factory):
+    """The app module, imported once with per-process caches and no background work"""
+    os.environ.update(FINOPS_SHARED_CACHE="none", FINOPS_PREFETCH="0", FINOPS_OFFLINE="1",
+                      FINOPS_HISTORY_DIR=str(tmp_path_factory.mktemp("history")))
+    os.environ.pop("FINOPS_AGENT_CACHE_FILE", None)
+    spec = importlib.util.spec_from_file_location("finance_webapp", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["finance_webapp"] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,39 @@
+import time
+
+
+def constant(value):
+    return lambda service, results: value
+
+
+def test_dependencies_run_first_and_see_their_results(webapp):
+    pipeline = webapp.EnrichmentPipeline({
+        "quotes": ((), constant({"AAPL": 190.0})),
+        "risk": (("quotes",), lambda service, results: results["quotes"]["AAPL"] * 2),
+        "failing": ((), lambda service, results: 1 / 0),
+        "after_failure": (("failing",), constant("never"))
+    }, dict(webapp.ENRICHMENT_CONFIG))
+    results, report = pipeline.run(["risk", "after_failure"], service=None)
+    assert results == {"quotes": {"AAPL": 190.0}, "risk": 380.0}
+    statuses = {name: timing["status"] for name, timing in report["providers"].items()}
+    assert statuses == {"quotes": "ok", "risk": "ok", "failing": "error", "after_failure": "skipped"}
+    assert report["degraded"]
+
+
+def test_cycles_and_unknown_dependencies_are_skipped_not_awaited(webapp):
+    pipeline = webapp.EnrichmentPipeline({
+        "a": (("b",), constant("a")),
+        "b": (("a",), constant("b")),
+        "needs_cycle": (("a",), constant("c")),
+        "needs_missing": (("missing",), constant("d")),
+        "fine": ((), constant("e"))
+    }, dict(webapp.ENRICHMENT_CONFIG))
+    started = time.perf_counter()
+    results, report = pipeline.run(["needs_cycle", "needs_missing", "fine", "nonexistent"], service=None,
+                                   budget_seconds=5)
+    assert time.perf_counter() - started < 1
+    assert results == {"fine": "e"}
+    providers = report["providers"]
+    assert all(providers[name]["status"] == "skipped" for name in ("a", "b", "needs_cycle", "needs_missing"))
+    assert providers["a"]["error"] == "dependency cycle a -> b -> a"
+    assert providers["needs_missing"]["error"] == "depends on missing"
+    assert providers["nonexistent"]["error"] == "unknown provider"
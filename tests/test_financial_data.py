@@ -0,0 +1,30 @@
+import asyncio
+import threading
+
+
+def test_pool_is_never_smaller_than_the_request_threads(webapp):
+    assert webapp.SERVER_CONFIG["io_workers"] >= webapp.SERVER_CONFIG["threads"]
+    assert webapp.ASYNC_RUNTIME.io_workers == webapp.SERVER_CONFIG["io_workers"]
+
+
+def test_local_types_do_not_queue_behind_hung_fetches(webapp, monkeypatch):
+    runtime = webapp.AsyncRuntime(io_workers=1)
+    release = threading.Event()
+    monkeypatch.setattr(webapp, "ASYNC_RUNTIME", runtime)
+    monkeypatch.setitem(webapp.SERVER_CONFIG, "request_timeout_seconds", 0.5)
+
+    async def hang():
+        await asyncio.get_running_loop().run_in_executor(None, release.wait, 10)
+    asyncio.run_coroutine_threadsafe(hang(), runtime._ensure_started())   # the only I/O worker is stuck
+    client = webapp.app.test_client()
+    try:
+        for data_type in sorted(webapp.LOCAL_DATA_TYPES):
+            response = client.get(f"/api/financial-data?type={data_type}&count=3")
+            assert response.status_code == 200, data_type
+        assert len(client.get("/api/financial-data?type=transactions&count=3").get_json()) == 3
+        # Types that do I/O still go through the pool and give up at the request timeout
+        assert client.get("/api/financial-data?type=shared_cache").status_code == 504
+    finally:
+        release.set()
+        runtime.stop()
+
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def brute_force_velocity(accounts, timestamps, window_seconds):
+    return np.array([np.sum((accounts == account) & (timestamps >= ts - window_seconds) & (timestamps <= ts))
+                     for account, ts in zip(accounts, timestamps)])
+
+
+def make_batch(webapp, accounts, amounts, timestamps, merchants=None):
+    n = len(accounts)
+    return webapp.TransactionBatch(
+        ids=np.arange(n, dtype=np.int64),
+        accounts=np.asarray(accounts, dtype=np.int32),
+        amounts=np.asarray(amounts, dtype=np.float64),
+        timestamps=np.asarray(timestamps, dtype=np.int64),
+        merchants=np.asarray(merchants if merchants is not None else [0] * n, dtype=np.uint8),
+        risk_scores=np.zeros(n, dtype=np.float32),
+        flags=np.zeros(n, dtype=np.uint8))
+
+
+def test_velocity_counts_match_a_brute_force_window(webapp):
+    rng = np.random.default_rng(3)
+    accounts = rng.integers(0, 20, 2000).astype(np.int32)
+    timestamps = rng.integers(1_700_000_000, 1_700_000_000 + 6 * 3600, 2000).astype(np.int64)
+    counts = webapp.FraudRuleEngine.velocity_counts(accounts, timestamps, 3600)
+    assert counts.tolist() == brute_force_velocity(accounts, timestamps, 3600).tolist()
+
+
+def test_velocity_window_is_inclusive_and_per_account(webapp):
+    accounts = np.array([1, 1, 1, 2, 1], dtype=np.int32)
+    timestamps = np.array([0, 3600, 3601, 3601, 7201], dtype=np.int64)
+    counts = webapp.FraudRuleEngine.velocity_counts(accounts, timestamps, 3600)
+    # 3600s after the first one is still inside its window, 3601s is not; account 2 is counted alone
+    assert counts.tolist() == [1, 2, 2, 1, 2]
+    assert webapp.FraudRuleEngine.velocity_counts(accounts[:0], timestamps[:0], 3600).tolist() == []
+
+
+def test_velocity_rule_fires_past_max_transactions(webapp):
+    engine = webapp.FraudRuleEngine()
+    limit = webapp.FRAUD_RULES["velocity"]["max_transactions"]
+    burst = limit + 1
+    batch = make_batch(webapp, [7] * burst + [8], [50.0] * (burst + 1), list(range(0, burst * 60, 60)) + [0])
+    scores, masks = engine.evaluate(batch)
+    velocity = (masks & (1 << webapp.FRAUD_RULES["velocity"]["bit"])) != 0
+    assert velocity.tolist() == [False] * limit + [True, False]
+    # The flagged row scores the same as the scalar path given its window count
+    expected, _ = engine.score_one(50.0, webapp.MERCHANTS[0], window_count=burst)
+    assert abs(float(scores[limit]) - expected) < 1e-6
+
+
+def test_streaming_velocity_alert_fires_once_per_window(webapp):
+    config = dict(webapp.STREAM_DETECTOR_CONFIG, window_seconds=60, velocity_threshold=3)
+    detector = webapp.StreamingFraudDetector(config)
+    fired = [detector.ingest({"account_id": "A", "amount": 20.0, "timestamp": ts}) for ts in (0, 10, 20, 30)]
+    assert [len(alerts) for alerts in fired] == [0, 0, 1, 0]
+    assert fired[2][0]["rule"] == "velocity" and fired[2][0]["window_count"] == 3
+
+    # Events older than the window drop out of the running count
+    detector.ingest({"account_id": "A", "amount": 20.0, "timestamp": 200})
+    window = detector._accounts["A"]
+    assert window.count == 1 and window.total == 20.0
+
+    # A new burst a full window after the last alert alerts again
+    fired = [detector.ingest({"account_id": "A", "amount": 20.0, "timestamp": ts}) for ts in (210, 220)]
+    assert [alert["rule"] for alerts in fired for alert in alerts] == ["velocity"]
+
+
+def test_streaming_detector_bounds_accounts(webapp):
+    config = dict(webapp.STREAM_DETECTOR_CONFIG, max_accounts=2)
+    detector = webapp.StreamingFraudDetector(config)
+    for account in ("A", "B", "A", "C"):
+        detector.ingest({"account_id": account, "amount": 10.0, "timestamp": 0})
+    assert list(detector._accounts) == ["A", "C"]   # B was least recently active
+    assert detector.stats()["evicted_accounts"] == 1
+
+
+def test_malformed_feed_records_are_skipped_and_counted(webapp):
+    detector = webapp.StreamingFraudDetector(dict(webapp.STREAM_DETECTOR_CONFIG))
+    lines = ['5', 'null', '[]', '{"account_id": "A"}', '{"amount": true}', '{"amount": "lots"}', 'not json',
+             '{"account_id": "A", "amount": 10.0, "timestamp": 0}']
+    assert detector.consume_lines(lines) == 1
+    assert detector.stats()["ingested"] == 1 and detector.stats()["malformed"] == 7
+
+
+def test_ingest_endpoint_rejects_a_bad_batch_before_ingesting_any_of_it(webapp, monkeypatch):
+    detector = webapp.StreamingFraudDetector(dict(webapp.STREAM_DETECTOR_CONFIG))
+    monkeypatch.setattr(webapp, "FRAUD_STREAM", detector)
+    client = webapp.app.test_client()
+    good = {"account_id": "A", "amount": 10.0, "timestamp": 0}
+
+    for batch, index in (([good, [1, 2]], 1), ([None], 0), ([good, good, {"account_id": "B"}], 2),
+                         ([good, {"amount": "NaN"}], 1)):
+        response = client.post("/api/transactions", json=batch)
+        assert response.status_code == 400 and response.is_json
+        assert response.get_json()["index"] == index and response.get_json()["ingested"] == 0
+    assert detector.ingested == 0
+
+    response = client.post("/api/transactions", json=[good, dict(good, amount="12.5")])
+    assert response.status_code == 200 and response.get_json()["ingested"] == 2
+    assert detector.ingested == 2
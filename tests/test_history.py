@@ -0,0 +1,85 @@
+import os
+from datetime import date
+
+import numpy as np
+
+
+def bars(first_day, count, base=100.0):
+    days = np.arange(first_day, first_day + count, dtype=np.int64)
+    close = base + np.arange(count, dtype=np.float64)
+    return {"date": days, "open": close - 0.5, "high": close + 1, "low": close - 1, "close": close,
+            "volume": np.arange(count, dtype=np.int64) * 1000 + 1}
+
+
+def assert_rows_match(columns, expected):
+    for name, values in expected.items():
+        assert np.asarray(columns[name]).tolist() == np.asarray(values).tolist(), name
+
+
+def test_range_reads_are_inclusive(webapp, tmp_path):
+    store = webapp.PriceHistoryStore(str(tmp_path))
+    assert store.append("aapl", bars(19000, 10)) == 10
+    assert store.last_date("AAPL") == 19009
+
+    window = store.read("AAPL", 19002, 19004)
+    assert window["date"].tolist() == [19002, 19003, 19004]
+    assert window["close"].tolist() == [102.0, 103.0, 104.0]
+    # Dates and ISO strings resolve to the same epoch days; open ends run to the edges
+    as_dates = store.read("AAPL", date(2022, 1, 10), "2022-01-13")
+    assert as_dates["date"].tolist() == [19002, 19003, 19004, 19005]
+    assert store.read("AAPL", end=19000)["date"].tolist() == [19000]
+    assert store.read("AAPL", start=19009)["date"].tolist() == [19009]
+    assert store.read("AAPL", 19100, 19200)["date"].tolist() == []
+    assert store.read("MISSING")["date"].tolist() == []
+
+
+def test_only_newer_rows_are_appended_and_the_latest_duplicate_wins(webapp, tmp_path):
+    store = webapp.PriceHistoryStore(str(tmp_path))
+    store.append("AAPL", bars(19000, 5))
+    update = bars(19003, 4, base=200.0)            # 19003-19004 are already stored
+    update["date"] = np.append(update["date"], 19006)
+    for name in ("open", "high", "low", "close", "volume"):
+        update[name] = np.append(update[name], update[name][-1] * 2)
+    assert store.append("AAPL", update) == 2
+    history = store.read("AAPL")
+    assert history["date"].tolist() == [19000, 19001, 19002, 19003, 19004, 19005, 19006]
+    assert history["close"].tolist()[-3:] == [104.0, 202.0, 406.0]
+
+
+def test_interrupted_append_is_realigned_by_the_next_one(webapp, tmp_path):
+    store = webapp.PriceHistoryStore(str(tmp_path))
+    store.append("AAPL", bars(19000, 5))
+    committed = store.read("AAPL")
+    committed = {name: np.array(values) for name, values in committed.items()}
+
+    # A crash part-way through the next append: some value columns got all their rows,
+    # close got a torn row, volume got none, and date got half of its first row
+    lost = bars(19005, 3, base=900.0)
+    for name in ("open", "high", "low"):
+        with open(store._path("AAPL", name), "ab") as f:
+            lost[name].astype(webapp.HISTORY_COLUMNS[name]).tofile(f)
+    with open(store._path("AAPL", "close"), "ab") as f:
+        f.write(lost["close"].astype("<f8").tobytes()[:12])
+    with open(store._path("AAPL", "date"), "ab") as f:
+        f.write(lost["date"].astype("<i8").tobytes()[:4])
+    sizes = {name: os.path.getsize(store._path("AAPL", name)) for name in webapp.HISTORY_COLUMNS}
+    assert len(set(sizes.values())) > 1
+
+    # Readers only see the rows the date column fully covers
+    reader = webapp.PriceHistoryStore(str(tmp_path))
+    assert reader.last_date("AAPL") == 19004
+    assert_rows_match(reader.read("AAPL"), committed)
+
+    # The retried append lands every new row at the same index in every column
+    retry = bars(19005, 3, base=300.0)
+    assert store.append("AAPL", retry) == 3
+    for name, dtype in webapp.HISTORY_COLUMNS.items():
+        assert os.path.getsize(store._path("AAPL", name)) == 8 * np.dtype(dtype).itemsize, name
+
+    for current in (store, webapp.PriceHistoryStore(str(tmp_path))):
+        assert_rows_match(current.read("AAPL", end=19004), committed)
+        assert_rows_match(current.read("AAPL", 19005, 19007), retry)
+        window = current.read("AAPL", 19004, 19005)
+        assert window["date"].tolist() == [19004, 19005]
+        assert window["close"].tolist() == [104.0, 300.0]
+        assert window["volume"].tolist() == [4001, 1]
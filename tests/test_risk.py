@@ -0,0 +1,65 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def engine(webapp):
+    return webapp.PortfolioRiskEngine(dict(webapp.RISK_CONFIG, portfolio_value=100, confidence=0.95, horizon_days=1))
+
+
+def test_historical_var_and_cvar_on_known_returns(engine):
+    simple = np.arange(-50, 50) / 100                    # -50% .. +49% in 1% steps
+    result = engine.analyze(["AAA"], np.log1p(simple)[:, None])
+    # 5% quantile interpolates between the 5th and 6th worst days; the tail is the 5 worst
+    assert result["historical"]["var"] == pytest.approx(45.05)
+    assert result["historical"]["cvar"] == pytest.approx(48.0)
+    assert result["observations"] == 100
+
+
+def test_parametric_var_and_cvar_match_the_normal_formulas(engine):
+    rng = np.random.default_rng(11)
+    returns = rng.normal(0.0005, 0.02, (750, 1))
+    result = engine.analyze(["AAA"], returns)
+    mu, sigma = returns.mean(), returns.std(ddof=1)
+    z = NormalDist().inv_cdf(0.05)
+    assert result["parametric"]["var"] == pytest.approx(-(mu + z * sigma) * 100, abs=0.01)
+    assert result["parametric"]["cvar"] == pytest.approx(-(mu - sigma * NormalDist().pdf(z) / 0.05) * 100, abs=0.01)
+    # Monte Carlo draws from the same normal, so it lands close to the closed form
+    assert result["monte_carlo"]["var"] == pytest.approx(result["parametric"]["var"], rel=0.1)
+    assert result["monte_carlo"]["cvar"] == pytest.approx(result["parametric"]["cvar"], rel=0.1)
+
+
+def test_cvar_is_never_below_var(engine):
+    rng = np.random.default_rng(5)
+    cov = np.array([[4.0, 1.2, 0.4], [1.2, 2.25, 0.3], [0.4, 0.3, 1.0]]) * 1e-4
+    returns = rng.multivariate_normal([0.0003, 0.0002, 0.0001], cov, 500)
+    result = engine.analyze(["AAA", "BBB", "CCC"], returns, weights=[0.5, 0.3, 0.2])
+    for method in ("historical", "parametric", "monte_carlo"):
+        assert result[method]["cvar"] >= result[method]["var"] > 0
+    components = {row["symbol"]: row["component_var"] for row in result["top_risk_contributors"]}
+    # Component VaRs add up to the parametric VaR (less the mean drift)
+    drift = float(returns.mean(axis=0) @ [0.5, 0.3, 0.2]) * 100
+    assert sum(components.values()) == pytest.approx(result["parametric"]["var"] + drift, abs=0.05)
+
+
+def test_multi_day_historical_var_compounds_overlapping_windows(webapp):
+    engine = webapp.PortfolioRiskEngine(dict(webapp.RISK_CONFIG, portfolio_value=100, horizon_days=5))
+    returns = np.full((30, 1), -0.01)                     # the same loss every day
+    result = engine.analyze(["AAA"], returns)
+    assert result["historical"]["var"] == pytest.approx(-math.expm1(-0.05) * 100, abs=0.01)
+    assert result["historical"]["cvar"] == pytest.approx(result["historical"]["var"], abs=0.01)
+
+
+def test_returns_matrix_aligns_on_common_dates(webapp):
+    histories = {
+        "AAA": {"date": np.array([1, 2, 3, 4]), "close": np.array([100.0, 110.0, 121.0, 133.1])},
+        "BBB": {"date": np.array([2, 3, 4, 5]), "close": np.array([50.0, 25.0, 50.0, 60.0])},
+        "CCC": {"date": np.array([9]), "close": np.array([1.0])}   # too short to have a return
+    }
+    symbols, dates, returns = webapp.PortfolioRiskEngine.returns_matrix(histories)
+    assert symbols == ["AAA", "BBB"]
+    assert dates.tolist() == [3, 4]
+    assert np.allclose(np.expm1(returns), [[0.1, -0.5], [0.1, 1.0]])
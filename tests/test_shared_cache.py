@@ -0,0 +1,259 @@
+import multiprocessing
+import os
+import threading
+import time
+import types
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from fakes.fake_agent_runtime import FakeBotoSession
+
+FAKES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fakes")
+fork = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    directory = tmp_path / "store"
+    directory.mkdir(mode=0o700)
+    return directory
+
+
+@pytest.fixture
+def backend(webapp, store_dir):
+    return webapp.SQLiteCacheBackend(str(store_dir / "shared.sqlite3"))
+
+
+def in_processes(count, target):
+    """Run target() in `count` forked workers started together; returns their results"""
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    start = context.Barrier(count)
+
+    def run():
+        start.wait()
+        results.put(target())
+
+    processes = [context.Process(target=run) for _ in range(count)]
+    for process in processes:
+        process.start()
+    values = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+    return values
+
+
+def test_values_round_trip_as_json(webapp, backend):
+    import pandas as pd
+    cache = webapp.SharedCache(backend, "test")
+    frame = pd.DataFrame({pd.Timestamp("2024-09-30"): [1.5, np.nan], pd.Timestamp("2023-09-30"): [2.0, 3.0]},
+                         index=["Net Income", "Total Debt"])
+    cache.set("frame", frame, 60)
+    cache.set("info", {"volume": np.int64(12), "close": np.float64(1.5), "at": datetime(2024, 1, 2, 3, 4)}, 60)
+
+    assert cache.get("frame")[0].equals(frame)
+    assert cache.get("info")[0] == {"volume": 12, "close": 1.5, "at": datetime(2024, 1, 2, 3, 4)}
+    payload = backend.get(cache._key("info"))[3]
+    assert payload[:1] == b"j" and b'"volume":12' in payload   # plain JSON, never pickle
+
+
+def test_unserializable_values_stay_per_process(webapp, backend):
+    cache = webapp.SharedCache(backend, "test")
+    cache.set("object", object(), 60)
+    assert cache.get("object") is None
+    assert cache.stats()["unshareable"] == 1 and cache.stats()["errors"] == 0
+
+
+def test_store_refuses_a_directory_others_can_access(webapp, store_dir):
+    os.chmod(store_dir, 0o755)
+    cache = webapp.SharedCache(webapp.SQLiteCacheBackend(str(store_dir / "shared.sqlite3")), "test")
+    cache.set("key", 1, 60)
+    assert cache.get("key") is None
+    assert cache.stats()["errors"] == 2
+    assert not (store_dir / "shared.sqlite3").exists()
+
+
+def test_store_refuses_a_group_readable_or_symlinked_file(webapp, store_dir, tmp_path):
+    path = store_dir / "shared.sqlite3"
+    path.touch(mode=0o644)
+    os.chmod(path, 0o644)
+    with pytest.raises(PermissionError):
+        webapp.SQLiteCacheBackend(str(path)).get("key")
+
+    path.unlink()
+    path.symlink_to(tmp_path / "elsewhere.sqlite3")
+    with pytest.raises(OSError):
+        webapp.SQLiteCacheBackend(str(path)).get("key")
+
+
+def test_default_store_is_in_a_private_user_directory(webapp):
+    path = webapp.SHARED_CACHE_CONFIG["path"]
+    if "FINOPS_SHARED_CACHE_PATH" not in os.environ:
+        assert not path.startswith("/tmp/")
+        assert os.path.dirname(path) == webapp._USER_CACHE_DIR
+
+
+@fork
+def test_load_runs_once_across_processes(webapp, backend, tmp_path):
+    calls = tmp_path / "calls"
+
+    def work():
+        cache = webapp.SharedCache(backend, "test")
+
+        def loader():
+            with open(calls, "a") as f:
+                f.write(f"{os.getpid()}\n")
+            time.sleep(0.3)
+            return {"loaded_by": os.getpid()}
+        return cache.load("quote", loader, ttl=60)[0]
+
+    values = in_processes(4, work)
+    assert len(calls.read_text().split()) == 1
+    assert len({value["loaded_by"] for value in values}) == 1
+
+
+@fork
+def test_lock_is_exclusive_across_processes(webapp, backend, tmp_path):
+    events = tmp_path / "events"
+
+    def work():
+        cache = webapp.SharedCache(backend, "test")
+        with cache.lock("download") as acquired:
+            with open(events, "a") as f:
+                f.write("enter\n")
+            time.sleep(0.05)
+            with open(events, "a") as f:
+                f.write("exit\n")
+        return acquired
+
+    assert in_processes(4, work) == [True] * 4
+    assert events.read_text().split() == ["enter", "exit"] * 4
+
+
+def test_lock_lease_frees_a_crashed_holder(backend):
+    assert backend.acquire("lock", "crashed-worker", 0.1)
+    assert not backend.acquire("lock", "other-worker", 30)
+    time.sleep(0.15)
+    assert backend.acquire("lock", "other-worker", 30)
+    backend.release("lock", "crashed-worker")   # no longer the owner - a no-op
+    assert not backend.acquire("lock", "third-worker", 30)
+
+
+@pytest.fixture
+def credentials(webapp, backend, tmp_path, monkeypatch):
+    """Factory for credential managers sharing the store, backed by the fake pybritive CLI"""
+    log = tmp_path / "pybritive.log"
+    monkeypatch.setenv("FAKE_PYBRITIVE_LOG", str(log))
+    monkeypatch.setattr(webapp, "boto3", types.SimpleNamespace(Session=FakeBotoSession))
+    config = dict(webapp.BRITIVE_CONFIG, executable=os.path.join(FAKES_DIR, "pybritive"))
+    managers = []
+
+    def make():
+        manager = webapp.BritiveCredentialManager(config, shared=webapp.SharedCache(backend, "britive"))
+        managers.append(manager)
+        return manager
+
+    def calls():
+        return [line.split()[1] for line in log.read_text().splitlines()] if log.exists() else []
+
+    yield make, calls
+    for manager in managers:
+        manager._stop.set()
+
+
+@fork
+def test_lease_is_checked_in_by_the_last_holder_only(webapp, backend, credentials):
+    make, calls = credentials
+    first = make()
+    first.acquire()
+
+    def other_worker():
+        worker = make()
+        worker.acquire()
+        worker.shutdown()
+        return worker.stats()
+
+    (stats,) = in_processes(1, other_worker)
+    assert stats["checkouts"] == 1 and stats["checkins"] == 0 and stats["checkins_deferred"] == 1
+    assert calls() == ["checkout", "checkout"]
+
+    first.shutdown()
+    assert calls() == ["checkout", "checkout", "checkin"]
+    assert first.stats()["checkins"] == 1
+    assert backend.get(first.shared._key("holders")) is None
+
+
+def test_shared_store_never_holds_credentials(webapp, backend, credentials):
+    make, _ = credentials
+    manager = make()
+    manager.acquire()
+    rows = backend._connection().execute("SELECT key, payload FROM entries").fetchall()
+    assert [key for key, _ in rows] == ["finops:britive:holders"]
+    assert all(b"fake-secret-access-key" not in payload and b"fake-session-token" not in payload
+               for _, payload in rows)
+    manager.shutdown()
+
+
+def test_expired_holders_do_not_block_check_in(webapp, backend, credentials):
+    make, calls = credentials
+    manager = make()
+    manager.acquire()
+    holders = manager.shared.get("holders")[0]
+    holders["crashed-worker"] = time.time() - 1
+    manager.shared.set("holders", holders, 60)
+    manager.shutdown()
+    assert calls() == ["checkout", "checkin"]
+
+
+@pytest.fixture
+def shared_market(webapp, backend, monkeypatch):
+    """MARKET_CACHE backed by the shared store, a fresh dashboard, and no upstream"""
+    cache = webapp.TTLCache(shared=webapp.SharedCache(backend, "market"))
+    monkeypatch.setattr(webapp, "MARKET_CACHE", cache)
+    monkeypatch.setattr(webapp, "DASHBOARD_METRICS", webapp.DashboardMetrics())
+
+    def no_upstream(*args, **kwargs):
+        raise AssertionError("went upstream for a bar another worker stored")
+    monkeypatch.setattr(webapp.MARKET_DATA, "quote", no_upstream)
+    monkeypatch.setattr(webapp.FinancialDataService, "_download_quotes", staticmethod(no_upstream))
+    # What another worker's cache looks like from here
+    return webapp.SharedCache(backend, "market")
+
+
+BAR = {"close": 101.0, "open": 100.0, "volume": 1000, "timestamp": "2024-06-03 00:00:00"}
+
+
+def test_adopted_bar_reaches_the_dashboard(webapp, shared_market):
+    shared_market.set(("quote", "ZZZ"), BAR, 60, 60)
+    assert webapp.FinancialDataService._get_daily_bar("ZZZ") == BAR
+    tile = webapp.DASHBOARD_METRICS.quotes(["ZZZ"])["ZZZ"]
+    assert tile["price"] == 101.0 and tile["change"] == 1.0
+
+    # Serving the same bar again leaves the dashboard version alone but marks the tile fresh
+    version = webapp.DASHBOARD_METRICS.version
+    webapp.DASHBOARD_METRICS._quotes["ZZZ"]["updated_at"] -= 3600
+    webapp.FinancialDataService._get_daily_bar("ZZZ")
+    assert webapp.DASHBOARD_METRICS.version == version
+    assert time.time() - webapp.DASHBOARD_METRICS.quotes(["ZZZ"])["ZZZ"]["updated_at"] < 5
+
+
+def test_bar_downloaded_by_another_worker_reaches_the_dashboard(webapp, shared_market):
+    other_worker_has_lock = threading.Event()
+
+    def other_worker():
+        with shared_market.lock(("download", "YYY")):
+            other_worker_has_lock.set()
+            time.sleep(0.2)
+            shared_market.set(("quote", "YYY"), BAR, 60, 60)
+
+    thread = threading.Thread(target=other_worker)
+    thread.start()
+    other_worker_has_lock.wait(5)
+    bars = webapp.FinancialDataService._refresh_quotes(["YYY"])
+    thread.join()
+
+    assert bars == {"YYY": BAR}
+    assert webapp.DASHBOARD_METRICS.quotes(["YYY"])["YYY"]["price"] == 101.0
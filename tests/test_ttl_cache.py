@@ -0,0 +1,123 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+def test_concurrent_misses_share_one_load(webapp):
+    cache = webapp.TTLCache(default_ttl=60)
+    calls = []
+    start = threading.Barrier(8)
+    results = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)   # every other thread arrives while this load is in flight
+        return {"close": 101.5}
+
+    def worker():
+        start.wait()
+        results.append(cache.get_or_load(("quote", "AAPL"), loader))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"close": 101.5}] * 8
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 7
+    assert cache.get_or_load(("quote", "AAPL"), loader) == {"close": 101.5}
+    assert len(calls) == 1
+
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached(webapp):
+    cache = webapp.TTLCache(default_ttl=60)
+    start = threading.Barrier(4)
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    def worker():
+        start.wait()
+        try:
+            cache.get_or_load("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["upstream down"] * 4
+    assert cache.stats()["errors"] == 1
+    assert cache.get_or_load("key", lambda: "recovered") == "recovered"
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(webapp):
+    executor = ThreadPoolExecutor(max_workers=1)
+    cache = webapp.TTLCache(default_ttl=60, refresh_executor=executor)
+    cache.set("quote", "old", ttl=0.05, stale_ttl=60)
+    time.sleep(0.1)
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "new"
+
+    value, age = cache.get_or_revalidate("quote", loader, ttl=60, stale_ttl=60)
+    assert value == "old" and age >= 0.05
+    # Still refreshing - later readers get the stale value without a second refresh
+    assert cache.get_or_revalidate("quote", loader, ttl=60, stale_ttl=60)[0] == "old"
+    release.set()
+    executor.shutdown(wait=True)
+
+    assert calls == [1]
+    assert cache.get_or_revalidate("quote", loader, ttl=60, stale_ttl=60) == ("new", None)
+    stats = cache.stats()
+    assert stats["stale_hits"] == 2 and stats["refreshes"] == 1
+
+
+def test_failed_refresh_keeps_stale_value_and_backs_off(webapp):
+    executor = ThreadPoolExecutor(max_workers=1)
+    cache = webapp.TTLCache(default_ttl=60, refresh_executor=executor, refresh_backoff=60)
+    cache.set("quote", "old", ttl=0.05, stale_ttl=60)
+    time.sleep(0.1)
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    assert cache.get_or_revalidate("quote", failing)[0] == "old"
+    executor.shutdown(wait=True)
+    assert cache.get_or_revalidate("quote", failing)[0] == "old"   # inside the backoff - no new refresh
+    assert calls == [1]
+    assert cache.stats()["refresh_errors"] == 1
+
+
+def test_expired_entry_without_stale_window_is_reloaded(webapp):
+    cache = webapp.TTLCache(default_ttl=60, refresh_executor=ThreadPoolExecutor(max_workers=1))
+    cache.set("quote", "old", ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("quote") is None
+    assert cache.get_or_revalidate("quote", lambda: "new") == ("new", None)
+
+
+@pytest.mark.parametrize("max_entries", [1, 3])
+def test_least_recently_used_entries_are_evicted(webapp, max_entries):
+    cache = webapp.TTLCache(max_entries=max_entries, default_ttl=60)
+    for key in range(max_entries + 2):
+        cache.set(key, key)
+    assert cache.stats()["size"] == max_entries
+    assert cache.get(0) is None
+    assert cache.get(max_entries + 1) == max_entries + 1